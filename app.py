@@ -1,8 +1,16 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+from json_provider import create_json_provider
 from routes import book_bp
  
 app = Flask(__name__)
+
+# Serialize JSON responses with orjson where it is available
+app.json = create_json_provider(app)
+
+# Emit compact JSON without sorting keys, even in debug mode
+app.json.sort_keys = False
+app.json.compact = True
  
 # Configure the CORS
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from models.book import Book
+
+# Location of the SQLite database, overridable for deployments
+DATABASE_PATH = os.environ.get(
+    'BOOKS_DATABASE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books.db')
+)
+
+# Field values of a book without its ID, in table column order
+BookValues = Tuple[str, str, Optional[Union[int, str]], str, Optional[int]]
+
+# Columns of the books table, in the order Book takes them
+BOOK_COLUMNS = 'id, title, author, published_date, language, no_of_pages'
+
+# Columns an update may change
+UPDATABLE_COLUMNS = ('title', 'author', 'published_date', 'language', 'no_of_pages')
+
+
+class WriteResult(NamedTuple):
+    """
+    Outcome of a write to the books table.
+    
+    Attributes:
+        book_ids (List[int]): IDs of the books that were written
+        previous_version (int): Data version before the write
+        version (int): Data version after the write
+    """
+    book_ids: List[int]
+    previous_version: int
+    version: int
+
+# Each thread gets its own connection, since sqlite3 connections must not
+# be used by two threads at once. Released connections are kept in a small
+# pool for the next thread, since a server may start a thread per request.
+POOL_SIZE = 8
+_local = threading.local()
+_pool: List[sqlite3.Connection] = []
+_pool_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a new connection to the books database."""
+    # Pooled connections move between threads, one thread at a time
+    connection = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    # WAL lets readers proceed while a write is in progress
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute('PRAGMA cache_size=-2000')
+    connection.execute('PRAGMA temp_store=MEMORY')
+    return connection
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's connection to the books database, taking one from the pool if needed."""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        with _pool_lock:
+            connection = _pool.pop() if _pool else None
+        if connection is None:
+            connection = _connect()
+        _local.connection = connection
+    return connection
+
+
+def release_connection() -> None:
+    """Return this thread's connection to the pool, closing it if the pool is full."""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        return
+    _local.connection = None
+    if connection.in_transaction:
+        connection.rollback()
+    with _pool_lock:
+        if len(_pool) < POOL_SIZE:
+            _pool.append(connection)
+            return
+    connection.close()
+
+
+@contextmanager
+def _write_transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Run a block in a transaction that holds the database write lock from the
+    start, so reads inside it cannot be invalidated by another process.
+    """
+    connection = get_connection()
+    connection.execute('BEGIN IMMEDIATE')
+    with connection:
+        yield connection
+
+
+def init_db(default_books: Iterable[Book]) -> None:
+    """
+    Create the books table if it does not exist and seed it when empty.
+    
+    Args:
+        default_books (Iterable[Book]): Books to insert into a new database
+    """
+    with _write_transaction() as connection:
+        # AUTOINCREMENT keeps SQLite from reusing the IDs of deleted books
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS books ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'title TEXT NOT NULL, '
+            'author TEXT NOT NULL, '
+            'published_date, '
+            'language TEXT NOT NULL, '
+            'no_of_pages INTEGER)'
+        )
+        _create_search_index(connection)
+        _create_version_counter(connection)
+        if connection.execute('SELECT 1 FROM books LIMIT 1').fetchone() is None:
+            connection.executemany(
+                'INSERT INTO books (id, title, author, published_date, language, no_of_pages) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [_to_row(book) for book in default_books]
+            )
+
+
+def _create_version_counter(connection: sqlite3.Connection) -> None:
+    """
+    Create the data version counter, which triggers bump on every change to
+    the books table, whichever process or connection makes it.
+    """
+    connection.execute('CREATE TABLE IF NOT EXISTS books_version (version INTEGER NOT NULL)')
+    if connection.execute('SELECT 1 FROM books_version').fetchone() is None:
+        connection.execute('INSERT INTO books_version (version) VALUES (0)')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        connection.execute(
+            f'CREATE TRIGGER IF NOT EXISTS books_version_{event.lower()} '
+            f'AFTER {event} ON books BEGIN '
+            'UPDATE books_version SET version = version + 1; '
+            'END'
+        )
+
+
+def _create_search_index(connection: sqlite3.Connection) -> None:
+    """
+    Create the full-text index used by searches, along with the triggers
+    that keep it in sync with the books table.
+    
+    The trigram tokenizer indexes every three-character substring
+    case-insensitively, so a phrase query matches the same books as a
+    substring search.
+    """
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+    ).fetchone()
+    if exists:
+        return
+    
+    connection.execute(
+        'CREATE VIRTUAL TABLE books_fts USING fts5('
+        "title, author, language, content='books', content_rowid='id', "
+        "tokenize='trigram')"
+    )
+    connection.execute(
+        'CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN '
+        'INSERT INTO books_fts (rowid, title, author, language) '
+        'VALUES (new.id, new.title, new.author, new.language); '
+        'END'
+    )
+    connection.execute(
+        'CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN '
+        "INSERT INTO books_fts (books_fts, rowid, title, author, language) "
+        "VALUES ('delete', old.id, old.title, old.author, old.language); "
+        'END'
+    )
+    connection.execute(
+        'CREATE TRIGGER books_fts_update AFTER UPDATE ON books BEGIN '
+        "INSERT INTO books_fts (books_fts, rowid, title, author, language) "
+        "VALUES ('delete', old.id, old.title, old.author, old.language); "
+        'INSERT INTO books_fts (rowid, title, author, language) '
+        'VALUES (new.id, new.title, new.author, new.language); '
+        'END'
+    )
+    # Index any books stored before the search index existed
+    connection.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+
+def get_version(connection: Optional[sqlite3.Connection] = None) -> int:
+    """Return the data version, which changes whenever any book is written."""
+    connection = connection or get_connection()
+    return connection.execute('SELECT version FROM books_version').fetchone()[0]
+
+
+def load_books() -> Tuple[int, List[Book]]:
+    """Return the data version and every stored book ordered by ID, read from one snapshot."""
+    connection = get_connection()
+    connection.execute('BEGIN')
+    with connection:
+        version = get_version(connection)
+        rows = connection.execute(
+            f'SELECT {BOOK_COLUMNS} FROM books ORDER BY id'
+        ).fetchall()
+    return version, [Book(*row) for row in rows]
+
+
+def search_book_ids(query: str) -> List[int]:
+    """
+    Return the IDs of books whose title, author, or language contains the
+    query, ordered by ID. The query must be at least three characters long.
+    """
+    phrase = '"' + query.replace('"', '""') + '"'
+    rows = get_connection().execute(
+        'SELECT rowid FROM books_fts WHERE books_fts MATCH ? ORDER BY rowid',
+        (phrase,)
+    )
+    return [row[0] for row in rows]
+
+
+def insert_books(books: Iterable[BookValues]) -> WriteResult:
+    """Store new books in a single transaction, letting SQLite assign their IDs."""
+    with _write_transaction() as connection:
+        previous_version = get_version(connection)
+        book_ids = []
+        for values in books:
+            row = connection.execute(
+                'INSERT INTO books (title, author, published_date, language, no_of_pages) '
+                'VALUES (?, ?, ?, ?, ?) RETURNING id',
+                values
+            ).fetchone()
+            book_ids.append(row[0])
+        return WriteResult(book_ids, previous_version, get_version(connection))
+
+
+def update_book(book_id: int, fields: Dict[str, Any]) -> Tuple[WriteResult, Optional[Book]]:
+    """
+    Change some field values of an existing book, given by column name, and
+    return the book as stored. Only the given columns are written, so
+    concurrent updates of different fields do not undo each other, and keys
+    that are not updatable columns are ignored. No book or ID is returned if
+    it no longer exists.
+    """
+    columns = [column for column in UPDATABLE_COLUMNS if column in fields]
+    with _write_transaction() as connection:
+        previous_version = get_version(connection)
+        if columns:
+            assignments = ', '.join(f'{column} = ?' for column in columns)
+            row = connection.execute(
+                f'UPDATE books SET {assignments} WHERE id = ? RETURNING {BOOK_COLUMNS}',
+                tuple(fields[column] for column in columns) + (book_id,)
+            ).fetchone()
+        else:
+            row = connection.execute(
+                f'SELECT {BOOK_COLUMNS} FROM books WHERE id = ?', (book_id,)
+            ).fetchone()
+        book = Book(*row) if row else None
+        book_ids = [book_id] if book else []
+        return WriteResult(book_ids, previous_version, get_version(connection)), book
+
+
+def delete_books(book_ids: Iterable[int]) -> WriteResult:
+    """Remove books by their IDs in a single transaction, returning the IDs that existed."""
+    with _write_transaction() as connection:
+        previous_version = get_version(connection)
+        deleted_ids = [
+            book_id for book_id in book_ids
+            if connection.execute('DELETE FROM books WHERE id = ?', (book_id,)).rowcount > 0
+        ]
+        return WriteResult(deleted_ids, previous_version, get_version(connection))
+
+
+def _to_row(book: Book) -> tuple:
+    """Return the column values of a book in table order."""
+    return (book.id, book.title, book.author, book.published_date,
+            book.language, book.no_of_pages)
@@ -0,0 +1,59 @@
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Re-exported for the routes; it lives in the models package so that Book
+# can use it without importing Flask
+from models.serialization import dumps_bytes as dumps_bytes
+
+try:
+    import orjson
+except ImportError:
+    # orjson does not support PyPy, where the standard library encoder
+    # is JIT-compiled instead
+    orjson = None  # type: ignore[assignment]
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes responses with orjson instead of the
+    standard library json module.
+
+    Every jsonify(...) call in the app goes through this provider, so the
+    routes do not need to know which encoder is in use.
+    """
+
+    def _options(self, sort_keys: bool, indent: bool) -> int:
+        """Build the orjson option flags for a dumps call."""
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize data as a JSON string using orjson."""
+        option = self._options(kwargs.get("sort_keys", self.sort_keys),
+                               bool(kwargs.get("indent")))
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON text or UTF-8 bytes using orjson."""
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as JSON and wrap them in a response."""
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._options(self.sort_keys, pretty) | orjson.OPT_APPEND_NEWLINE
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=option),
+            mimetype=self.mimetype
+        )
+
+
+def create_json_provider(app: Flask) -> DefaultJSONProvider:
+    """Return the orjson provider when orjson is installed, else Flask's default one."""
+    if orjson is None:
+        return DefaultJSONProvider(app)
+    return OrjsonProvider(app)
@@ -1,21 +1,34 @@
 from datetime import date
+from typing import Any, Dict, Optional, Union
+
+from models.serialization import dumps_bytes
 
 
 class Book:
     """
     Book model class representing a book entity.
     
+    This module can optionally be compiled with mypyc (`mypyc models/book.py`)
+    for faster attribute access; the deploy workflow does not compile it. A
+    compiled Book enforces its type annotations at runtime, so request data
+    must be validated before a Book is built from it, as the routes do.
+    
     Attributes:
         id (int): Unique identifier for the book
         title (str): Title of the book
         author (str): Author of the book  
-        published_date (date): Date when the book was published
+        published_date (Optional[Union[date, int, str]]): Date or year when the book was published, if known
         language (str): Language of the book
-        no_of_pages (int): Number of pages in the book
+        no_of_pages (Optional[int]): Number of pages in the book, if known
+        search_text (str): Lowercased title, author, and language used for searching
     """
     
-    def __init__(self, id: int, title: str, author: str, published_date: date, 
-                 language: str, no_of_pages: int):
+    __slots__ = ("id", "title", "author", "published_date", "language",
+                 "no_of_pages", "search_text", "_dict", "_json")
+    
+    def __init__(self, id: int, title: str, author: str,
+                 published_date: Optional[Union[date, int, str]],
+                 language: str, no_of_pages: Optional[int]) -> None:
         """
         Initialize a Book instance.
         
@@ -23,9 +36,9 @@ class Book:
             id (int): Unique identifier for the book
             title (str): Title of the book
             author (str): Author of the book
-            published_date (date): Date when the book was published
+            published_date (Optional[Union[date, int, str]]): Date or year when the book was published, if known
             language (str): Language of the book
-            no_of_pages (int): Number of pages in the book
+            no_of_pages (Optional[int]): Number of pages in the book, if known
         """
         self.id = id
         self.title = title
@@ -33,22 +46,50 @@ class Book:
         self.published_date = published_date
         self.language = language
         self.no_of_pages = no_of_pages
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """
+        Recompute the search text and drop the cached dictionary and JSON.
+        
+        Must be called whenever any field of the book changes.
+        """
+        self.search_text: str = f"{self.title}\n{self.author}\n{self.language}".lower()
+        self._dict: Optional[Dict[str, Any]] = None
+        self._json: Optional[bytes] = None
     
-    def __repr__(self):
+    def __repr__(self) -> str:
         """Return a string representation of the Book object."""
         return f"Book(id={self.id}, title='{self.title}', author='{self.author}', published_date='{self.published_date}', language='{self.language}', no_of_pages={self.no_of_pages})"
     
-    def __str__(self):
+    def __str__(self) -> str:
         """Return a human-readable string representation of the Book object."""
         return f"{self.title} by {self.author} ({self.published_date})"
 
-    def to_dict(self):
-        """Return a dictionary representation of the Book object."""
-        return {
-            "id": self.id,
-            "title": self.title,
-            "author": self.author,
-            "published_date": self.published_date,
-            "language": self.language,
-            "no_of_pages": self.no_of_pages
-        }
\ No newline at end of file
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return a dictionary representation of the Book object.
+        
+        The dictionary is built once and reused until refresh() is called,
+        so callers must not modify it.
+        """
+        if self._dict is None:
+            self._dict = {
+                "id": self.id,
+                "title": self.title,
+                "author": self.author,
+                "published_date": self.published_date,
+                "language": self.language,
+                "no_of_pages": self.no_of_pages
+            }
+        return self._dict
+
+    def to_json(self) -> bytes:
+        """
+        Return the JSON encoding of to_dict() as UTF-8 bytes.
+        
+        Like the dictionary, the encoding is cached until refresh() is called.
+        """
+        if self._json is None:
+            self._json = dumps_bytes(self.to_dict())
+        return self._json
@@ -0,0 +1,43 @@
+import dataclasses
+import decimal
+import email.utils
+import json
+import uuid
+from datetime import date, datetime, time, timezone
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    # orjson does not support PyPy, where the standard library encoder
+    # is JIT-compiled instead
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(obj: Any) -> Any:
+    """
+    Convert a value the encoder does not support, the same way Flask's JSON
+    provider does, without importing Flask.
+    """
+    if isinstance(obj, date):
+        if not isinstance(obj, datetime):
+            # A plain date is taken as midnight UTC
+            obj = datetime.combine(obj, time(), tzinfo=timezone.utc)
+        elif obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        else:
+            obj = obj.astimezone(timezone.utc)
+        return email.utils.format_datetime(obj, usegmt=True)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize data as compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is None:
+        return json.dumps(obj, default=_default,
+                          ensure_ascii=False, separators=(",", ":")).encode()
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
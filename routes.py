@@ -1,12 +1,20 @@
-from flask import Blueprint, jsonify, request
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+import database
+from flask import Blueprint, Response, current_app, jsonify, request
+from json_provider import dumps_bytes
 from models.book import Book
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from werkzeug.exceptions import HTTPException
 
 # Create Blueprint for book routes
 book_bp = Blueprint('books', __name__, url_prefix='/api/books')
 
-# In-memory storage for books (minimum 5 book objects as requested)
-books_data: List[Book] = [
+# Books used to seed a new database (minimum 5 book objects as requested)
+DEFAULT_BOOKS: List[Book] = [
     Book(1, "To Kill a Mockingbird", "Harper Lee", 1960, "English", 336),
     Book(2, "1984", "George Orwell", 1949, "English", 328),
     Book(3, "Pride and Prejudice", "Jane Austen", 1813, "English", 279),
@@ -16,134 +24,453 @@ books_data: List[Book] = [
     Book(7, "Don Quixote", "Miguel de Cervantes", 1605, "Spanish", 863)
 ]
 
+# Books are persisted in SQLite, which may be shared by several processes,
+# and each process keeps a copy in memory for reads. Every change is written
+# to the database before the in-memory copy is updated, and the copy is
+# reloaded whenever the database's data version shows another process
+# changed it.
+database.init_db(DEFAULT_BOOKS)
+
+# In-memory books keyed by ID, and the data version they reflect. Dicts
+# keep insertion order and SQLite assigns increasing IDs to new books, which
+# are added under the write lock, so iterating the values lists the books in
+# ID order, while lookups and deletes by ID take constant time.
+_books_version, _loaded_books = database.load_books()
+books_by_id: Dict[int, Book] = {book.id: book for book in _loaded_books}
+database.release_connection()
+
+# Error message returned when a route fails unexpectedly, by view name
+ERROR_MESSAGES: Dict[str, str] = {
+    'get_all_books': "Failed to fetch books",
+    'get_book_by_id': "Failed to fetch book",
+    'create_book': "Failed to create book",
+    'create_books': "Failed to create books",
+    'update_book': "Failed to update book",
+    'delete_book': "Failed to delete book",
+    'delete_books': "Failed to delete books",
+    'search_book': "Failed to search books"
+}
+
+# Text fields that must be present and non-empty when creating a book
+REQUIRED_FIELDS = ['title', 'author', 'language']
+
+# Range of integers SQLite can store
+SQLITE_INTEGER_MIN = -2 ** 63
+SQLITE_INTEGER_MAX = 2 ** 63 - 1
+
+# Held while a change is written to the database and applied to
+# books_by_id, or while the books are reloaded, since requests may run
+# concurrently. This keeps new books in ID order and stops an update from
+# bringing back a book deleted meanwhile.
+_write_lock = threading.RLock()
+
+# Serialized response bodies for the read endpoints, with an ETag for the
+# all-books body. The generation counter is bumped whenever the books
+# change, so a body built from data that was modified in the meantime is
+# never stored.
+SEARCH_CACHE_SIZE = 128
+_all_books_cache: Optional[Tuple[bytes, str]] = None
+_search_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_cache_generation = 0
+_cache_lock = threading.Lock()
+
+# Column layout of the books' search text for queries too short for the
+# trigram index: every book's text joined into one string, the offset at
+# which each book's text starts, and the books in the same order. Scanning
+# it with str.find runs in C instead of looping over the books in Python.
+SEARCH_COLUMN_SEPARATOR = '\0'
+_search_column: Optional[Tuple[str, List[int], List[Book]]] = None
+
 def find_book_by_id(book_id: int) -> Optional[Book]:
     """Helper function to find a book by its ID"""
-    return next((book for book in books_data if book.id == book_id), None)
+    return books_by_id.get(book_id)
+
+def get_all_books_list() -> List[Book]:
+    """Helper function to get a snapshot of all books in ID order"""
+    return list(books_by_id.values())
+
+def reload_books() -> None:
+    """
+    Helper function to replace the in-memory books with the ones in the
+    database, unless they are already current. That is checked again under
+    the write lock, since another thread may have applied its own write, or
+    reloaded, while this one waited.
+    """
+    global books_by_id, _books_version
+    with _write_lock:
+        if database.get_version() == _books_version:
+            return
+        _books_version, books = database.load_books()
+        books_by_id = {book.id: book for book in books}
+    invalidate_caches()
+
+def sync_after_write(result: database.WriteResult) -> bool:
+    """
+    Helper function to check whether a write can be applied to books_by_id
+    directly, which is the case unless another process changed the database
+    since the books were loaded. Otherwise the books are reloaded, which
+    already includes the write, and False is returned. Must be called while
+    holding the write lock.
+    """
+    global _books_version
+    if result.previous_version != _books_version:
+        reload_books()
+        return False
+    _books_version = result.version
+    return True
+
+def validate_book_data(data, partial: bool = False) -> Optional[str]:
+    """
+    Helper function to check book data from a request, returning an error
+    message if it is invalid. With partial=True only the fields present are
+    checked, as for an update.
+    """
+    if not isinstance(data, dict):
+        return "Book data must be a JSON object"
+    
+    for field in REQUIRED_FIELDS:
+        if partial and field not in data:
+            continue
+        value = data.get(field)
+        if not partial and not value:
+            return f"Missing required field: {field}"
+        if not isinstance(value, str) or not value:
+            return f"Field '{field}' must be a non-empty string"
+    
+    no_of_pages = data.get('no_of_pages')
+    if no_of_pages is not None and type(no_of_pages) is not int:
+        return "Field 'no_of_pages' must be an integer"
+    
+    published_date = data.get('published_date')
+    if published_date is not None and type(published_date) not in (int, str):
+        return "Field 'published_date' must be a string or an integer"
+    
+    for field in ('no_of_pages', 'published_date'):
+        value = data.get(field)
+        if type(value) is int and not SQLITE_INTEGER_MIN <= value <= SQLITE_INTEGER_MAX:
+            return f"Field '{field}' is out of range"
+    
+    return None
+
+def book_values_from_data(data: dict) -> database.BookValues:
+    """Helper function to get the field values of a new book from request data"""
+    return (data['title'], data['author'], data.get('published_date'),
+            data['language'], data.get('no_of_pages'))
+
+def describe_book_count(count: int) -> str:
+    """Helper function to describe a number of books, such as 1 book or 3 books"""
+    return f"{count} book" if count == 1 else f"{count} books"
+
+def find_books_matching(query: str) -> List[Book]:
+    """Helper function to find books whose title, author, or language contains the query"""
+    if len(query) < 3:
+        # Too short for the trigram index, so scan the search text column
+        return scan_search_column(query)
+    
+    book_ids = database.search_book_ids(query)
+    return [books_by_id[book_id] for book_id in book_ids if book_id in books_by_id]
+
+def get_search_column() -> Tuple[str, List[int], List[Book]]:
+    """Helper function to get the search text column, building it if needed"""
+    global _search_column
+    column = _search_column
+    if column is not None:
+        return column
+    
+    generation = get_cache_generation()
+    books = get_all_books_list()
+    starts = []
+    offset = 0
+    for book in books:
+        starts.append(offset)
+        offset += len(book.search_text) + len(SEARCH_COLUMN_SEPARATOR)
+    text = SEARCH_COLUMN_SEPARATOR.join([book.search_text for book in books])
+    column = (text, starts, books)
+    with _cache_lock:
+        if generation == _cache_generation:
+            _search_column = column
+    return column
+
+def scan_search_column(query: str) -> List[Book]:
+    """Helper function to find books whose search text contains the query using the search text column"""
+    if SEARCH_COLUMN_SEPARATOR in query:
+        return []
+    
+    text, starts, books = get_search_column()
+    matching_books = []
+    position = text.find(query)
+    while position != -1:
+        index = bisect_right(starts, position) - 1
+        matching_books.append(books[index])
+        # Continue from the start of the next book so each book matches once
+        if index + 1 == len(starts):
+            break
+        position = text.find(query, starts[index + 1])
+    return matching_books
+
+def build_books_body(books: List[Book], query: Optional[str] = None) -> bytes:
+    """Helper function to build a success response body listing books from their cached JSON"""
+    head = b'{"status":"success","data":['
+    tail = b'],"total":%d' % len(books)
+    if query is not None:
+        tail += b',"query":' + dumps_bytes(query)
+    tail += b'}\n'
+    
+    fragments = [book.to_json() for book in books]
+    if not fragments:
+        return head + tail
+    
+    # Attach the envelope to the first and last fragments, so the join is
+    # the only copy of the whole body
+    fragments[0] = head + fragments[0]
+    fragments[-1] = fragments[-1] + tail
+    return b','.join(fragments)
+
+def get_cache_generation() -> int:
+    """Helper function to get the current response cache generation"""
+    return _cache_generation
+
+def invalidate_caches() -> None:
+    """Helper function to drop cached response bodies and the search text column after the books change"""
+    global _all_books_cache, _cache_generation, _search_column
+    with _cache_lock:
+        _cache_generation += 1
+        _all_books_cache = None
+        _search_cache.clear()
+        _search_column = None
 
-def get_next_book_id() -> int:
-    """Helper function to get the next available book ID"""
-    return max(book.id for book in books_data) + 1 if books_data else 1
+def store_all_books_cache(body: bytes, etag: str, generation: int) -> None:
+    """Helper function to cache the all-books body and its ETag if the books are unchanged"""
+    global _all_books_cache
+    with _cache_lock:
+        if generation == _cache_generation:
+            _all_books_cache = (body, etag)
+
+def make_cached_response(body: bytes, etag: str) -> Response:
+    """Helper function to wrap a cached body in a response, answering 304 if the client already has it"""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.make_conditional(request)
+    return response
+
+def get_search_cache(query: str) -> Optional[bytes]:
+    """Helper function to get the cached search body for a query"""
+    with _cache_lock:
+        body = _search_cache.get(query)
+        if body is not None:
+            _search_cache.move_to_end(query)
+        return body
+
+def store_search_cache(query: str, body: bytes, generation: int) -> None:
+    """Helper function to cache a search body, evicting the least recently used"""
+    with _cache_lock:
+        if generation != _cache_generation:
+            return
+        _search_cache[query] = body
+        _search_cache.move_to_end(query)
+        if len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+@book_bp.before_request
+def sync_books():
+    """Reload the in-memory books if another process changed the database"""
+    if database.get_version() != _books_version:
+        reload_books()
+
+@book_bp.teardown_request
+def release_connection(error: Optional[BaseException]) -> None:
+    """Return the request thread's database connection to the pool"""
+    database.release_connection()
+
+@book_bp.errorhandler(Exception)
+def handle_error(error: Exception):
+    """Return a JSON error response for any exception raised by a book route"""
+    if isinstance(error, HTTPException):
+        return jsonify({
+            "status": "error",
+            "message": error.description
+        }), error.code
+    
+    current_app.logger.exception(error)
+    view_name = (request.endpoint or '').rpartition('.')[2]
+    return jsonify({
+        "status": "error",
+        "message": ERROR_MESSAGES.get(view_name, "Internal server error")
+    }), 500
 
 @book_bp.route('/', methods=['GET'])
 def get_all_books():
     """Get all books"""
-    try:
-        return jsonify({
-            "status": "success",
-            "data": [book.to_dict() for book in books_data],
-            "total": len(books_data)
-        }), 200
-    except Exception as e:
-        print(e)
-        return jsonify({
-            "status": "error",
-            "message": "Failed to fetch books"
-        }), 500
+    cached = _all_books_cache
+    if cached is not None:
+        return make_cached_response(*cached)
+    
+    generation = get_cache_generation()
+    body = build_books_body(get_all_books_list())
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    store_all_books_cache(body, etag, generation)
+    return make_cached_response(body, etag)
 
 @book_bp.route('/<int:book_id>', methods=['GET'])
 def get_book_by_id(book_id: int):
     """Get a book by its ID"""
-    try:
-        book = find_book_by_id(book_id)
-        if book:
-            return jsonify({
-                "status": "success",
-                "data": book.to_dict()
-            }), 200
-        else:
-            return jsonify({
-                "status": "error",
-                "message": f"Book with ID {book_id} not found"
-            }), 404
-    except Exception as e:
+    book = find_book_by_id(book_id)
+    if book:
+        body = b'{"status":"success","data":' + book.to_json() + b'}\n'
+        return Response(body, mimetype='application/json'), 200
+    else:
         return jsonify({
             "status": "error",
-            "message": "Failed to fetch book"
-        }), 500
+            "message": f"Book with ID {book_id} not found"
+        }), 404
 
 @book_bp.route('/', methods=['POST'])
 def create_book():
     """Create a new book"""
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['title', 'author', 'language']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({
-                    "status": "error",
-                    "message": f"Missing required field: {field}"
-                }), 400
-        
-        # Create new book with auto-generated ID
-        new_book = Book(
-            id=get_next_book_id(),
-            title=data['title'],
-            author=data['author'],
-            language=data['language'],
-            isbn=data.get('isbn'),
-            published_year=data.get('published_year'),
-            genre=data.get('genre')
-        )
-        
-        books_data.append(new_book)
-        
+    data = request.get_json()
+    
+    # Validate required fields and field types
+    error = validate_book_data(data)
+    if error:
         return jsonify({
-            "status": "success",
-            "message": "Book created successfully",
-            "data": new_book.to_dict()
-        }), 201
-        
-    except Exception as e:
+            "status": "error",
+            "message": error
+        }), 400
+    
+    # Create new book with an ID assigned by the database
+    values = book_values_from_data(data)
+    with _write_lock:
+        result = database.insert_books([values])
+        new_book = Book(result.book_ids[0], *values)
+        if sync_after_write(result):
+            books_by_id[new_book.id] = new_book
+    invalidate_caches()
+    
+    return jsonify({
+        "status": "success",
+        "message": "Book created successfully",
+        "data": new_book.to_dict()
+    }), 201
+
+@book_bp.route('/bulk', methods=['POST'])
+def create_books():
+    """Create several books in a single transaction"""
+    data = request.get_json()
+    
+    if not isinstance(data, list) or not data:
         return jsonify({
             "status": "error",
-            "message": "Failed to create book"
-        }), 500
+            "message": "Request body must be a non-empty list of books"
+        }), 400
+    
+    # Validate every book before creating any of them
+    for index, book_data in enumerate(data):
+        error = validate_book_data(book_data)
+        if error:
+            return jsonify({
+                "status": "error",
+                "message": f"{error} in book at index {index}"
+            }), 400
+    
+    # Create new books with IDs assigned by the database
+    values = [book_values_from_data(book_data) for book_data in data]
+    with _write_lock:
+        result = database.insert_books(values)
+        new_books = [Book(book_id, *book_values)
+                     for book_id, book_values in zip(result.book_ids, values)]
+        if sync_after_write(result):
+            books_by_id.update((book.id, book) for book in new_books)
+    invalidate_caches()
+    
+    return jsonify({
+        "status": "success",
+        "message": f"{describe_book_count(len(new_books))} created successfully",
+        "data": [book.to_dict() for book in new_books],
+        "total": len(new_books)
+    }), 201
 
-@book_bp.route('/<int:book_id>', methods=['PUT'])
-def update_book(book_id: int):
-    """Update a book by its ID"""
-    try:
-        book = find_book_by_id(book_id)
-        if not book:
+@book_bp.route('/bulk', methods=['DELETE'])
+def delete_books():
+    """Delete several books by their IDs in a single transaction"""
+    data = request.get_json()
+    
+    if (not isinstance(data, list) or not data or
+            not all(type(book_id) is int for book_id in data)):
+        return jsonify({
+            "status": "error",
+            "message": "Request body must be a non-empty list of book IDs"
+        }), 400
+    
+    if len(set(data)) != len(data):
+        return jsonify({
+            "status": "error",
+            "message": "Request body must not contain duplicate book IDs"
+        }), 400
+    
+    with _write_lock:
+        # Make sure every book exists before deleting any of them
+        missing_ids = [book_id for book_id in data if book_id not in books_by_id]
+        if missing_ids:
             return jsonify({
                 "status": "error",
-                "message": f"Book with ID {book_id} not found"
+                "message": f"Books with IDs {missing_ids} not found"
             }), 404
         
-        data = request.get_json()
-        
-        # Update book fields if provided in request
-        if 'title' in data:
-            book.title = data['title']
-        if 'author' in data:
-            book.author = data['author']
-        if 'language' in data:
-            book.language = data['language']
-        if 'isbn' in data:
-            book.isbn = data['isbn']
-        if 'published_year' in data:
-            book.published_year = data['published_year']
-        if 'genre' in data:
-            book.genre = data['genre']
-        
+        result = database.delete_books(data)
+        if sync_after_write(result):
+            for book_id in result.book_ids:
+                del books_by_id[book_id]
+    invalidate_caches()
+    
+    return jsonify({
+        "status": "success",
+        "message": f"{describe_book_count(len(data))} deleted successfully"
+    }), 200
+
+@book_bp.route('/<int:book_id>', methods=['PUT'])
+def update_book(book_id: int):
+    """Update a book by its ID"""
+    if not find_book_by_id(book_id):
         return jsonify({
-            "status": "success",
-            "message": "Book updated successfully",
-            "data": book.to_dict()
-        }), 200
-        
-    except Exception as e:
+            "status": "error",
+            "message": f"Book with ID {book_id} not found"
+        }), 404
+    
+    data = request.get_json()
+    
+    # Validate the types of the fields being updated
+    error = validate_book_data(data, partial=True)
+    if error:
         return jsonify({
             "status": "error",
-            "message": "Failed to update book"
-        }), 500
+            "message": error
+        }), 400
+    
+    # Write only the fields provided in the request, so a concurrent update
+    # of other fields, possibly by another process, is kept, and reply with
+    # the book as stored. A failed write leaves the in-memory book unchanged.
+    with _write_lock:
+        # The book may have been deleted since it was looked up
+        result, updated_book = database.update_book(book_id, data)
+        if updated_book is None:
+            return jsonify({
+                "status": "error",
+                "message": f"Book with ID {book_id} not found"
+            }), 404
+        if sync_after_write(result):
+            books_by_id[book_id] = updated_book
+    invalidate_caches()
+    
+    return jsonify({
+        "status": "success",
+        "message": "Book updated successfully",
+        "data": updated_book.to_dict()
+    }), 200
 
 @book_bp.route('/<int:book_id>', methods=['DELETE'])
 def delete_book(book_id: int):
     """Delete a book by its ID"""
-    try:
+    with _write_lock:
         book = find_book_by_id(book_id)
         if not book:
             return jsonify({
@@ -151,48 +478,35 @@ def delete_book(book_id: int):
                 "message": f"Book with ID {book_id} not found"
             }), 404
         
-        books_data.remove(book)
-        
-        return jsonify({
-            "status": "success",
-            "message": f"Book with ID {book_id} deleted successfully"
-        }), 200
-        
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": "Failed to delete book"
-        }), 500
+        result = database.delete_books([book_id])
+        if sync_after_write(result):
+            del books_by_id[book_id]
+    invalidate_caches()
+    
+    return jsonify({
+        "status": "success",
+        "message": f"Book with ID {book_id} deleted successfully"
+    }), 200
 
 @book_bp.route('/search', methods=['GET'])
 def search_book():
     """Search books by title, author, or language"""
-    try:
-        query = request.args.get('q', '').lower().strip()
-        
-        if not query:
-            return jsonify({
-                "status": "error",
-                "message": "Search query parameter 'q' is required"
-            }), 400
-        
-        # Search in title, author, and language fields
-        matching_books = []
-        for book in books_data:
-            if (query in book.title.lower() or 
-                query in book.author.lower() or 
-                query in book.language.lower()):
-                matching_books.append(book)
-        
-        return jsonify({
-            "status": "success",
-            "data": [book.to_dict() for book in matching_books],
-            "total": len(matching_books),
-            "query": query
-        }), 200
-        
-    except Exception as e:
+    query = request.args.get('q', '').lower().strip()
+    
+    if not query:
         return jsonify({
             "status": "error",
-            "message": "Failed to search books"
-        }), 500
\ No newline at end of file
+            "message": "Search query parameter 'q' is required"
+        }), 400
+    
+    body = get_search_cache(query)
+    if body is not None:
+        return Response(body, mimetype='application/json'), 200
+    
+    # Search in title, author, and language fields
+    generation = get_cache_generation()
+    matching_books = find_books_matching(query)
+    
+    body = build_books_body(matching_books, query)
+    store_search_cache(query, body, generation)
+    return Response(body, mimetype='application/json'), 200